@@ -2,37 +2,45 @@
 """Helper script to check if .env file is configured correctly"""
 import os
 from pathlib import Path
-from dotenv import load_dotenv
+from dotenv import load_dotenv, dotenv_values
 
 # Get backend directory
 backend_dir = Path(__file__).parent
 env_file = backend_dir / '.env'
+env_stat = env_file.stat() if env_file.exists() else None
+
+# Don't bother parsing absurdly large files - a real .env is a few hundred bytes
+MAX_ENV_FILE_SIZE = 65536
+
+
+def _mask(secret):
+    """Mask a secret, keeping just enough of each end to verify it"""
+    return secret[:7] + '...' + secret[-4:] if len(secret) > 11 else '***'
+
 
 print(f"🔍 Checking .env configuration...")
 print(f"📍 .env file path: {env_file}")
-print(f"📁 File exists: {env_file.exists()}")
-print(f"📊 File size: {env_file.stat().st_size if env_file.exists() else 0} bytes")
+print(f"📁 File exists: {env_stat is not None}")
+print(f"📊 File size: {env_stat.st_size if env_stat else 0} bytes")
 print()
 
-if env_file.exists():
+if env_stat is not None and env_stat.st_size > MAX_ENV_FILE_SIZE:
+    print(f"⚠️  .env file is unexpectedly large ({env_stat.st_size} bytes); skipping content check.")
+elif env_stat is not None:
     print("📄 File contents:")
-    with open(env_file, 'r') as f:
-        content = f.read()
-        if content.strip():
-            # Show first and last few chars of key for verification
-            lines = content.split('\n')
-            for line in lines:
-                if 'OPENAI_API_KEY' in line and '=' in line:
-                    key_part = line.split('=')[1].strip()
-                    if key_part:
-                        masked = key_part[:7] + '...' + key_part[-4:] if len(key_part) > 11 else '***'
-                        print(f"  ✅ Found: OPENAI_API_KEY={masked}")
-                    else:
-                        print(f"  ⚠️  Found but empty: {line}")
-                elif line.strip() and not line.strip().startswith('#'):
-                    print(f"  📝 {line.split('=')[0] if '=' in line else line}")
-        else:
-            print("  ⚠️  File is empty!")
+    # dotenv_values parses the file in one pass (no hand-rolled line splitting)
+    values = dotenv_values(env_file)
+    if values:
+        for key, value in values.items():
+            if key == 'OPENAI_API_KEY':
+                if value:
+                    print(f"  ✅ Found: OPENAI_API_KEY={_mask(value)}")
+                else:
+                    print(f"  ⚠️  Found but empty: {key}")
+            else:
+                print(f"  📝 {key}")
+    else:
+        print("  ⚠️  File is empty!")
 else:
     print("❌ .env file does not exist!")
     print()
@@ -50,7 +58,7 @@ load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
 if api_key:
     print(f"✅ OPENAI_API_KEY is set (length: {len(api_key)} characters)")
-    print(f"   Starts with: {api_key[:7]}...")
+    print(f"   Key: {_mask(api_key)}")
 else:
     print("❌ OPENAI_API_KEY is not set!")
     print()
@@ -2,24 +2,62 @@
 LLM Service for converting natural language to SQL
 Uses OpenAI GPT models to generate SQL queries from natural language
 """
+import functools
 import os
-from openai import OpenAI
+import re
+import orjson
 from typing import Optional
 from schema_context import get_schema_context
 from dotenv import load_dotenv
 
-# Load environment variables - try multiple locations
-backend_dir = os.path.dirname(os.path.abspath(__file__))
-load_dotenv(dotenv_path=os.path.join(backend_dir, '.env'))
-load_dotenv()  # Also try loading from current directory
+# Load environment variables - skipped entirely when the key is already in
+# the environment (containerized deploys); otherwise try backend/.env first
+# and fall back to the current directory
+if not os.getenv("OPENAI_API_KEY"):
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    if not load_dotenv(dotenv_path=os.path.join(backend_dir, '.env')):
+        load_dotenv()
+
+# Precompiled validation patterns - word boundaries avoid false positives
+# on identifiers like "updated_at", and one pass beats 9 substring scans
+_FORBIDDEN_RE = re.compile(
+    r"\b(DROP|DELETE|UPDATE|INSERT|ALTER|CREATE|TRUNCATE|GRANT|REVOKE)\b",
+    re.IGNORECASE
+)
+_SELECT_RE = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+
+# The schema is a static constant, so the whole system prompt is invariant -
+# build it once at import instead of re-concatenating it on every request
+_SYSTEM_PROMPT = f"""You are a SQL expert assistant. Your task is to convert natural language questions into accurate SQL queries for a data warehouse with a star schema.
+
+{get_schema_context()}
+
+**Important Guidelines:**
+1. Always use proper JOINs to connect fact and dimension tables
+2. Use descriptive column aliases where helpful
+3. Include appropriate WHERE clauses when filtering is mentioned
+4. Use aggregate functions (SUM, COUNT, AVG, etc.) when asked for totals, averages, counts
+5. Include ORDER BY for "top", "highest", "lowest" type queries
+6. Use LIMIT for queries asking for "top N" or "first N"
+7. Return ONLY the SQL query, no explanations in the SQL itself
+8. Use DuckDB SQL syntax
+9. Table names are case-sensitive: transaction_fact, dim_user, dim_category, dim_payment, dim_date
+10. Always validate that foreign key relationships are correct
+
+Respond in JSON format with two keys:
+- "sql_query": The generated SQL query (as a string)
+- "explanation": A brief explanation of what the query does"""
 
 # Lazy initialization of OpenAI client
 _client = None
 
-def get_openai_client() -> OpenAI:
+def get_openai_client():
     """Get or create OpenAI client (lazy initialization)"""
     global _client
     if _client is None:
+        # Imported here so the (heavy) openai package doesn't slow down startup
+        from openai import OpenAI
+
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set. Please check your .env file.")
@@ -42,65 +80,59 @@ def get_openai_client() -> OpenAI:
     
     return _client
 
+@functools.lru_cache(maxsize=512)
+def _generate_sql_cached(model: str, normalized_query: str) -> tuple:
+    """
+    Call OpenAI and return (sql_query, explanation).
+
+    Cached on (model, normalized question) so repeated questions skip the
+    API round-trip (and its cost) entirely; the cache lives until process
+    restart. Failed calls are not cached.
+    """
+    user_prompt = f"""Convert this natural language question to SQL:
+
+"{normalized_query}"
+
+Generate a SQL query that answers this question using the star schema provided above."""
+
+    client = get_openai_client()
+    response = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": _SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ],
+        temperature=0.3,  # Lower temperature for more deterministic SQL
+        response_format={"type": "json_object"}  # Force JSON response
+    )
+
+    result = orjson.loads(response.choices[0].message.content)
+
+    return (result.get("sql_query", "").strip(), result.get("explanation", ""))
+
+
 def generate_sql_query(natural_language_query: str, model: str = "gpt-4o-mini") -> dict:
     """
     Convert natural language query to SQL using OpenAI.
-    
+
     Args:
         natural_language_query: User's question in natural language
         model: OpenAI model to use (default: gpt-4o-mini for cost efficiency)
-    
+
     Returns:
         dict with 'sql_query' and 'explanation' keys
     """
-    schema_context = get_schema_context()
-    
-    system_prompt = f"""You are a SQL expert assistant. Your task is to convert natural language questions into accurate SQL queries for a data warehouse with a star schema.
-
-{schema_context}
-
-**Important Guidelines:**
-1. Always use proper JOINs to connect fact and dimension tables
-2. Use descriptive column aliases where helpful
-3. Include appropriate WHERE clauses when filtering is mentioned
-4. Use aggregate functions (SUM, COUNT, AVG, etc.) when asked for totals, averages, counts
-5. Include ORDER BY for "top", "highest", "lowest" type queries
-6. Use LIMIT for queries asking for "top N" or "first N"
-7. Return ONLY the SQL query, no explanations in the SQL itself
-8. Use DuckDB SQL syntax
-9. Table names are case-sensitive: transaction_fact, dim_user, dim_category, dim_payment, dim_date
-10. Always validate that foreign key relationships are correct
-
-Respond in JSON format with two keys:
-- "sql_query": The generated SQL query (as a string)
-- "explanation": A brief explanation of what the query does"""
-    
-    user_prompt = f"""Convert this natural language question to SQL:
-
-"{natural_language_query}"
+    # Normalize case/whitespace so trivially different phrasings share a
+    # cache entry
+    normalized_query = " ".join(natural_language_query.lower().split())
 
-Generate a SQL query that answers this question using the star schema provided above."""
-    
     try:
-        client = get_openai_client()
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.3,  # Lower temperature for more deterministic SQL
-            response_format={"type": "json_object"}  # Force JSON response
-        )
-        
-        import json
-        result = json.loads(response.choices[0].message.content)
-        
+        sql_query, explanation = _generate_sql_cached(model, normalized_query)
         return {
-            "sql_query": result.get("sql_query", "").strip(),
-            "explanation": result.get("explanation", "")
+            "sql_query": sql_query,
+            "explanation": explanation
         }
-    
+
     except Exception as e:
         raise Exception(f"Failed to generate SQL query: {str(e)}")
 
@@ -115,27 +147,20 @@ def validate_sql_query(sql_query: str) -> dict:
     Returns:
         dict with 'valid' (bool) and 'error' (str) keys
     """
-    sql_upper = sql_query.upper().strip()
-    
     # Block dangerous operations
-    dangerous_keywords = [
-        "DROP", "DELETE", "UPDATE", "INSERT", "ALTER", 
-        "CREATE", "TRUNCATE", "GRANT", "REVOKE"
-    ]
-    
-    for keyword in dangerous_keywords:
-        if keyword in sql_upper:
-            return {
-                "valid": False,
-                "error": f"Query contains forbidden operation: {keyword}. Only SELECT queries are allowed."
-            }
-    
+    match = _FORBIDDEN_RE.search(sql_query)
+    if match:
+        return {
+            "valid": False,
+            "error": f"Query contains forbidden operation: {match.group(1).upper()}. Only SELECT queries are allowed."
+        }
+
     # Check if it's a SELECT query
-    if not sql_upper.startswith("SELECT"):
+    if not _SELECT_RE.match(sql_query):
         return {
             "valid": False,
             "error": "Only SELECT queries are allowed."
         }
-    
+
     return {"valid": True, "error": None}
 
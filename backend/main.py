@@ -3,35 +3,82 @@ FastAPI Backend for Data Warehouse Query Interface
 """
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Optional
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
-# Load environment variables FIRST, before importing modules that need them
-backend_dir = os.path.dirname(os.path.abspath(__file__))
-load_dotenv(dotenv_path=os.path.join(backend_dir, '.env'))
-load_dotenv()  # Also try loading from current directory
+# Load environment variables FIRST, before importing modules that need them.
+# Skip the filesystem entirely when the orchestrator already provides the key
+# (the common containerized case); otherwise try backend/.env, then fall back
+# to the current directory
+if not os.getenv("OPENAI_API_KEY"):
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    if not load_dotenv(dotenv_path=os.path.join(backend_dir, '.env')):
+        load_dotenv()
 
-from llm_service import generate_sql_query, validate_sql_query
-from query_service import execute_query, get_available_tables
+# llm_service pulls in openai and query_service pulls in duckdb/boto3 - some
+# of the heaviest Python imports around. Defer them to the first request that
+# needs them so uvicorn boots fast.
+_llm_service = None
+_query_service = None
+
+
+def _get_llm_service():
+    global _llm_service
+    if _llm_service is None:
+        import llm_service
+        _llm_service = llm_service
+    return _llm_service
+
+
+def _get_query_service():
+    global _query_service
+    if _query_service is None:
+        import query_service
+        _query_service = query_service
+    return _query_service
+
+
+# Query execution runs on this pool so long DuckDB queries don't block the
+# event loop; each worker gets its own cursor on the shared connection
+_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+# Check the API key once at startup instead of walking os.environ per request
+_API_KEY_PRESENT = bool(os.getenv("OPENAI_API_KEY"))
+
+
+def refresh_api_key_flag():
+    """Re-check the environment for OPENAI_API_KEY (e.g. after tests mutate env)"""
+    global _API_KEY_PRESENT
+    _API_KEY_PRESENT = bool(os.getenv("OPENAI_API_KEY"))
+    return _API_KEY_PRESENT
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Data Warehouse Query API",
     description="API for converting natural language to SQL and executing queries",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse  # fastest path for large query results
 )
 
-# Configure CORS for frontend
+# Configure CORS for frontend - exact method/header lists keep preflight
+# handling cheap (no header echoing) and shrink the attack surface
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://localhost:3000", "http://localhost:8000"],  # Vite default ports
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type"],
 )
 
+# Compress large JSON payloads (query results can be hundreds of KB)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 
 # Request/Response Models
 class NaturalLanguageQuery(BaseModel):
@@ -83,7 +130,7 @@ def health_check():
 def get_tables():
     """Get list of available tables in the data warehouse"""
     try:
-        tables = get_available_tables()
+        tables = _get_query_service().get_available_tables()
         return {"tables": tables}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get tables: {str(e)}")
@@ -104,17 +151,18 @@ def generate_sql(request: NaturalLanguageQuery):
         raise HTTPException(status_code=400, detail="Query cannot be empty")
     
     # Check if OpenAI API key is set
-    if not os.getenv("OPENAI_API_KEY"):
+    if not _API_KEY_PRESENT:
         raise HTTPException(
             status_code=500,
             detail="OPENAI_API_KEY environment variable not set"
         )
     
     try:
-        result = generate_sql_query(request.query, request.model)
-        
+        llm_service = _get_llm_service()
+        result = llm_service.generate_sql_query(request.query, request.model)
+
         # Validate the generated SQL
-        validation = validate_sql_query(result["sql_query"])
+        validation = llm_service.validate_sql_query(result["sql_query"])
         if not validation["valid"]:
             return SQLGenerationResponse(
                 sql_query=result["sql_query"],
@@ -133,7 +181,7 @@ def generate_sql(request: NaturalLanguageQuery):
 
 
 @app.post("/api/execute-query", response_model=SQLQueryResponse)
-def execute_sql(request: SQLQueryRequest):
+async def execute_sql(request: SQLQueryRequest):
     """
     Execute SQL query against the data warehouse.
     
@@ -147,12 +195,14 @@ def execute_sql(request: SQLQueryRequest):
         raise HTTPException(status_code=400, detail="SQL query cannot be empty")
     
     # Validate SQL query
-    validation = validate_sql_query(request.sql_query)
+    validation = _get_llm_service().validate_sql_query(request.sql_query)
     if not validation["valid"]:
         raise HTTPException(status_code=400, detail=validation["error"])
-    
+
     try:
-        result = execute_query(request.sql_query, request.limit)
+        result = await asyncio.get_running_loop().run_in_executor(
+            _POOL, _get_query_service().execute_query, request.sql_query, request.limit
+        )
         
         if result["error"]:
             raise HTTPException(status_code=500, detail=result["error"])
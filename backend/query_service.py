@@ -2,8 +2,9 @@
 Query Service for executing SQL queries against DuckDB/MinIO data warehouse
 """
 import os
-import duckdb
-import boto3
+import atexit
+import threading
+import time
 from typing import Optional, Dict, Any
 import json
 
@@ -16,31 +17,66 @@ AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 BUCKET_NAME = "datalake"
 GOLD_PREFIX = "gold"
 
+# Resolve the DuckDB file location once at import - the path can't change
+# mid-process, so there's no point re-running the os.path dance per call
+_SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+_DB_PATH = next(
+    (
+        path for path in [
+            os.path.join(os.path.dirname(_SCRIPT_DIR), "scripts", "etl.duckdb"),
+            DUCKDB_FILE,
+        ]
+        if os.path.exists(path)
+    ),
+    ":memory:"
+)
 
-def get_db_connection() -> duckdb.DuckDBPyConnection:
-    """Create and configure DuckDB connection with MinIO access"""
-    # Determine DuckDB file path
-    script_dir = os.path.dirname(os.path.realpath(__file__))
-    db_path = os.path.join(os.path.dirname(script_dir), "scripts", "etl.duckdb")
-    
-    # If running in container or different location
-    if not os.path.exists(db_path):
-        db_path = DUCKDB_FILE if os.path.exists(DUCKDB_FILE) else ":memory:"
-    
-    con = duckdb.connect(db_path)
-    
-    # Configure S3/MinIO access
-    minio_host = MINIO_ENDPOINT.replace('http://', '').replace('https://', '')
-    con.execute(f"""
-        SET s3_endpoint='{minio_host}';
-        SET s3_use_ssl=false;
-        SET s3_url_style='path';
-        SET s3_access_key_id='{AWS_KEY}';
-        SET s3_secret_access_key='{AWS_SECRET}';
-        SET s3_region='{AWS_REGION}';
-    """)
-    
-    return con
+
+# Shared connection, created lazily on first use (opening the DuckDB file and
+# running the S3 pragmas per request is pure overhead)
+_connection: Optional["duckdb.DuckDBPyConnection"] = None
+_connection_lock = threading.Lock()
+
+
+def get_db_connection() -> "duckdb.DuckDBPyConnection":
+    """Get a cursor on the shared DuckDB connection, creating it on first use"""
+    global _connection
+    if _connection is None:
+        with _connection_lock:
+            if _connection is None:
+                # Imported here to keep duckdb off the server's import path
+                import duckdb
+
+                # Core settings go through the connect config dict; the s3_*
+                # knobs belong to the httpfs extension, which duckdb 1.0.0
+                # only accepts via SET after the connection exists. The
+                # metadata/object caches keep parquet footers and min/max
+                # indexes in memory, so repeat queries against the same gold
+                # files skip the HTTP footer round-trip.
+                minio_host = MINIO_ENDPOINT.replace('http://', '').replace('https://', '')
+                con = duckdb.connect(_DB_PATH, config={
+                    "enable_http_metadata_cache": "true",
+                    "enable_object_cache": "true",
+                    "threads": os.cpu_count(),
+                })
+                con.execute(f"""
+                    SET s3_endpoint='{minio_host}';
+                    SET s3_use_ssl=false;
+                    SET s3_url_style='path';
+                    SET s3_access_key_id='{AWS_KEY}';
+                    SET s3_secret_access_key='{AWS_SECRET}';
+                    SET s3_region='{AWS_REGION}';
+                """)
+                try:
+                    con.execute("SET http_keep_alive=true")
+                except Exception:
+                    pass  # older DuckDB versions lack this knob
+
+                atexit.register(con.close)
+                _connection = con
+
+    # Hand out a cursor so concurrent requests don't share query state
+    return _connection.cursor()
 
 
 def execute_query(sql_query: str, limit: Optional[int] = None) -> Dict[str, Any]:
@@ -58,38 +94,59 @@ def execute_query(sql_query: str, limit: Optional[int] = None) -> Dict[str, Any]
     try:
         con = get_db_connection()
         
-        # Apply limit if specified
-        if limit and "LIMIT" not in sql_query.upper():
-            # Add LIMIT if not present
-            sql_query = f"{sql_query.rstrip(';')} LIMIT {limit}"
-        
-        # Execute query
-        result = con.execute(sql_query)
-        
-        # Get column names
-        columns = [desc[0] for desc in result.description] if result.description else []
-        
-        # Fetch all rows
-        rows = result.fetchall()
-        
-        # Convert rows to list of dictionaries
-        rows_dict = [dict(zip(columns, row)) for row in rows]
-        
-        # Handle special types (convert to JSON-serializable format)
-        for row in rows_dict:
-            for key, value in row.items():
-                if hasattr(value, 'isoformat'):  # datetime objects
-                    row[key] = value.isoformat()
-                elif hasattr(value, '__float__'):  # Decimal, etc.
-                    try:
-                        row[key] = float(value)
-                    except (ValueError, TypeError):
-                        row[key] = str(value)
-        
+        import pyarrow as pa
+
+        # Enforce the safety limit by wrapping the query and binding the limit
+        # as a prepared-statement parameter. DuckDB keeps whichever LIMIT is
+        # tighter, and this handles LIMITs inside subqueries correctly. The
+        # newline before the closing paren keeps a trailing -- comment from
+        # swallowing it.
+        if limit:
+            wrapped = f"SELECT * FROM ({sql_query.rstrip(';')}\n) _safe_wrap LIMIT ?"
+            result = con.execute(wrapped, [limit])
+        else:
+            result = con.execute(sql_query)
+
+        # Stream the result in Arrow record batches so peak memory stays at
+        # one batch plus the accumulated rows, instead of materializing every
+        # row twice (tuples + dicts) like fetchall() did
+        reader = result.fetch_record_batch(1024)
+
+        # Cast Decimal columns to float so rows are JSON-serializable
+        target_schema = pa.schema([
+            pa.field(f.name, pa.float64()) if pa.types.is_decimal(f.type) else f
+            for f in reader.schema
+        ])
+        columns = target_schema.names
+
+        # Columns needing conversion are derived once from the result schema;
+        # only timestamp/date/time columns still need per-value work
+        # (decimals were already cast vectorized above). INTERVAL columns
+        # are deliberately excluded - their values have no isoformat()
+        temporal_idx = [
+            i for i, f in enumerate(target_schema)
+            if pa.types.is_timestamp(f.type)
+            or pa.types.is_date(f.type)
+            or pa.types.is_time(f.type)
+        ]
+
+        # Rows go out as positional arrays - clients index into them via the
+        # columns list - so column names aren't repeated once per row in the
+        # JSON payload
+        rows = []
+        for batch in reader:
+            batch_tbl = pa.Table.from_batches([batch]).cast(target_schema)
+            batch_cols = [col.to_pylist() for col in batch_tbl.columns]
+            for i in temporal_idx:
+                batch_cols[i] = [
+                    v.isoformat() if v is not None else None for v in batch_cols[i]
+                ]
+            rows.extend(list(row) for row in zip(*batch_cols))
+
         return {
             "columns": columns,
-            "rows": rows_dict,
-            "row_count": len(rows_dict),
+            "rows": rows,
+            "row_count": len(rows),
             "error": None
         }
     
@@ -106,21 +163,32 @@ def execute_query(sql_query: str, limit: Optional[int] = None) -> Dict[str, Any]
             con.close()
 
 
+# Tables change on deployments, not per request - cache the catalog query
+_TABLES_CACHE_TTL = 60.0
+_tables_cache: Optional[tuple] = None
+
+
 def get_available_tables() -> list:
-    """Get list of available tables in the data warehouse"""
+    """Get list of available tables in the data warehouse (cached briefly)"""
+    global _tables_cache
+    if _tables_cache and time.monotonic() - _tables_cache[0] < _TABLES_CACHE_TTL:
+        return _tables_cache[1]
+
     con = None
     try:
         con = get_db_connection()
-        
+
         # Try to get tables from DuckDB
         try:
             result = con.execute("""
-                SELECT table_name 
-                FROM information_schema.tables 
+                SELECT table_name
+                FROM information_schema.tables
                 WHERE table_schema = 'main'
-            """).fetchall()
-            tables = [row[0] for row in result]
+            """)
+            # fetchnumpy extracts the column without building Python tuples
+            tables = result.fetchnumpy()["table_name"].tolist()
             if tables:
+                _tables_cache = (time.monotonic(), tables)
                 return tables
         except:
             pass
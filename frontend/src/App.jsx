@@ -237,8 +237,8 @@ function App() {
                   <tbody>
                     {results.rows.map((row, idx) => (
                       <tr key={idx}>
-                        {results.columns.map((col) => (
-                          <td key={col}>{row[col] ?? <span className="null-value">NULL</span>}</td>
+                        {results.columns.map((col, colIdx) => (
+                          <td key={col}>{row[colIdx] ?? <span className="null-value">NULL</span>}</td>
                         ))}
                       </tr>
                     ))}
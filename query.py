@@ -1,34 +1,34 @@
+import os
 import duckdb
-import boto3
-import uuid
 
 # ============================================================
 # 1. Connect to or create a local DuckDB database file
 # ============================================================
 con = duckdb.connect("etl.duckdb")
 
-s3 = boto3.client(
-    's3',
-    endpoint_url="http://127.0.0.1:9000",
-    aws_access_key_id="minio",
-    aws_secret_access_key="minio123",
-    region_name="us-east-1"
-)
-
-con.execute("""
+con.execute(f"""
     SET s3_endpoint='127.0.0.1:9000';
     SET s3_use_ssl=false;
     SET s3_url_style='path';
     SET s3_access_key_id='minio';
     SET s3_secret_access_key='minio123';
     SET s3_region='us-east-1';
+    SET enable_http_metadata_cache=true;
+    PRAGMA threads={os.cpu_count()};
 """)
 
-df = con.execute("""
+# Typed DATE predicate lets DuckDB prune row groups via parquet min/max stats;
+# fetchall on 10 rows skips the pandas DataFrame round-trip entirely
+result = con.execute("""
 SELECT * FROM read_parquet('s3://datalake/gold/gold_07dd74f74eb3443cac4ba4cf1d59badb.parquet')
-WHERE month >= '2025-01-01'
+WHERE month >= DATE '2025-01-01'
 ORDER BY total_spent DESC
 LIMIT 10;
-""").fetchdf()
+""")
+
+columns = [desc[0] for desc in result.description]
+rows = result.fetchall()
 
-print(df)
\ No newline at end of file
+print(" | ".join(columns))
+for row in rows:
+    print(" | ".join(str(value) for value in row))
\ No newline at end of file
@@ -1,6 +1,4 @@
 import duckdb
-import boto3
-import uuid
 import os
 import sys
 
@@ -12,15 +10,6 @@ MINIO_ENDPOINT = "http://localhost:9000"
 if os.path.exists('/opt/airflow'):
     MINIO_ENDPOINT = "http://minio:9000"
 
-s3 = boto3.client(
-    's3',
-    endpoint_url=MINIO_ENDPOINT,
-    aws_access_key_id="minio",
-    aws_secret_access_key="minio123",
-    region_name="us-east-1"
-)
-
-
 s3_host = MINIO_ENDPOINT.replace('http://', '').replace('https://', '')
 con.execute(f"""
     SET s3_endpoint='{s3_host}';
@@ -38,20 +27,17 @@ silver_prefix = "silver"
 print("✅ Connected to DuckDB and configured MinIO access")
 
 
-resp = s3.list_objects_v2(
-    Bucket=bucket_name,
-    Prefix=f"{bronze_prefix}/"
-)
-
-if "Contents" not in resp:
-    print("⚠️ No objects found inside Bronze folder!")
-    sys.exit(0)
-
-parquet_files = [
-    f"s3://{bucket_name}/{obj['Key']}"
-    for obj in resp["Contents"]
-    if obj["Key"].endswith(".parquet")
-]
+# DuckDB's httpfs runs the S3 LIST natively with the creds configured above,
+# so no boto3 client (or its import cost) is needed
+try:
+    parquet_files = [
+        row[0] for row in con.execute(
+            f"SELECT file FROM glob('s3://{bucket_name}/{bronze_prefix}/*.parquet')"
+        ).fetchall()
+    ]
+except Exception as e:
+    print("❌ Error listing objects from MinIO:", e)
+    sys.exit(1)
 
 if not parquet_files:
     print("⚠️ No Bronze parquet files found!")
@@ -62,40 +48,40 @@ print(f"📦 Found {len(parquet_files)} Bronze parquet files")
 print("🚀 Transforming Bronze → Silver...")
 
 
-for file in parquet_files:
-
-    # Generate unique parquet name
-    silver_file = f"s3://{bucket_name}/{silver_prefix}/silver_{uuid.uuid4().hex}.parquet"
-
-    con.execute(f"""
-        COPY (
-            SELECT 
-                user_id,
-                name,
-                email,
-                phone,
-                street_address,
-                city,
-                country,
-                transaction_id,
-                TRY_CAST(transaction_date AS TIMESTAMP) AS transaction_date,
-                TRY_CAST(amount AS DOUBLE) AS amount,
-                currency,
-                merchant,
-                category,
-                transaction_type,
-                payment_method
-            FROM read_parquet('{file}')
-            WHERE email LIKE '%@%'
-              AND amount IS NOT NULL
-              AND TRY_CAST(amount AS DOUBLE) > 0
-              AND TRY_CAST(transaction_date AS TIMESTAMP) IS NOT NULL
-        )
-        TO '{silver_file}'
-        (FORMAT PARQUET, OVERWRITE_OR_IGNORE TRUE)
-    """)
-
-    print(f"✅ Silver file written: {silver_file}")
+# One fused COPY reads every bronze file and writes silver output in parallel;
+# PER_THREAD_OUTPUT gives each writer thread its own uniquely-named file, so
+# no per-file loop (and no per-file plan + S3 round-trip) is needed
+con.execute(f"PRAGMA threads={os.cpu_count()};")
+con.execute(f"""
+    COPY (
+        SELECT
+            user_id,
+            name,
+            email,
+            phone,
+            street_address,
+            city,
+            country,
+            transaction_id,
+            TRY_CAST(transaction_date AS TIMESTAMP) AS transaction_date,
+            TRY_CAST(amount AS DOUBLE) AS amount,
+            currency,
+            merchant,
+            category,
+            transaction_type,
+            payment_method
+        FROM read_parquet('s3://{bucket_name}/{bronze_prefix}/*.parquet')
+        WHERE email LIKE '%@%'
+          AND amount IS NOT NULL
+          AND TRY_CAST(amount AS DOUBLE) > 0
+          AND TRY_CAST(transaction_date AS TIMESTAMP) IS NOT NULL
+    )
+    TO 's3://{bucket_name}/{silver_prefix}'
+    (FORMAT PARQUET, COMPRESSION ZSTD, COMPRESSION_LEVEL 3,
+     ROW_GROUP_SIZE 1048576, PER_THREAD_OUTPUT TRUE, OVERWRITE_OR_IGNORE TRUE)
+""")
+
+print(f"✅ Silver files written to s3://{bucket_name}/{silver_prefix}/")
 
 # ============================================================
 # 6. Preview sample of silver output
@@ -46,6 +46,10 @@ CREATE TABLE transaction_fact (
     payment_id          BIGINT NOT NULL,
     transaction_amount  NUMERIC(18,2) NOT NULL,
 
+    -- Partition keys for the gold export, derived from date_id (YYYYMMDDHHMM)
+    year                INT GENERATED ALWAYS AS ((date_id // 100000000)::INT),
+    month               INT GENERATED ALWAYS AS (((date_id // 1000000) % 100)::INT),
+
     FOREIGN KEY (category_id) REFERENCES dim_category(category_id),
     FOREIGN KEY (date_id) REFERENCES dim_date(date_id),
     FOREIGN KEY (user_id) REFERENCES dim_user(user_id),
@@ -24,6 +24,21 @@ def get_minio_endpoint():
         return MINIO_ENDPOINT_CONTAINER
     return MINIO_ENDPOINT_LOCAL
 
+def tune_duckdb_s3(con):
+    """Enable httpfs caching/prefetch knobs (best-effort, version-dependent)"""
+    for setting in (
+        "SET enable_http_metadata_cache=true",
+        "SET enable_object_cache=true",
+        "SET http_keep_alive=true",
+        "SET http_timeout=60000",
+        "SET prefetch_all_parquet_files=true",
+        f"SET threads={os.cpu_count()}",
+    ):
+        try:
+            con.execute(setting)
+        except Exception:
+            pass  # older DuckDB versions lack some of these knobs
+
 def setup_duckdb_s3(con, minio_endpoint):
     """Configure DuckDB to access MinIO/S3"""
     s3_host = minio_endpoint.replace('http://', '').replace('https://', '')
@@ -35,13 +50,28 @@ def setup_duckdb_s3(con, minio_endpoint):
         SET s3_secret_access_key='{AWS_SECRET}';
         SET s3_region='{AWS_REGION}';
     """)
+    tune_duckdb_s3(con)
+
+# Tables known to this DuckDB file, loaded once per run. duckdb_tables() is a
+# direct catalog lookup, far cheaper than materializing information_schema
+_known_tables = None
+
+def _table_exists(con, table_name):
+    """Check table existence against the cached catalog"""
+    global _known_tables
+    if _known_tables is None:
+        try:
+            _known_tables = {
+                row[0] for row in con.execute("SELECT table_name FROM duckdb_tables()").fetchall()
+            }
+        except Exception:
+            _known_tables = set()
+    return table_name in _known_tables
 
 def query_from_duckdb_table(con, table_name):
     """Try to query from DuckDB table"""
     try:
-        # Check if table exists
-        result = con.execute(f"SELECT COUNT(*) FROM information_schema.tables WHERE table_name = '{table_name}'").fetchone()
-        if result[0] > 0:
+        if _table_exists(con, table_name):
             query = f"SELECT COUNT(*) AS total_rows FROM {table_name};"
             result = con.execute(query).fetchone()
             return result[0]
@@ -49,33 +79,81 @@ def query_from_duckdb_table(con, table_name):
         print(f"⚠️ Could not query from DuckDB table: {e}")
     return None
 
+def _parquet_source(table_name):
+    """Gold path + hive flag for a table.
+
+    transaction_fact is written Hive-partitioned on year/month, so its source
+    is a recursive glob with hive_partitioning enabled - DuckDB then prunes
+    partitions from the path values for date-filtered scans. The dims are
+    plain single files.
+    """
+    if table_name == "transaction_fact":
+        return f"s3://{BUCKET_NAME}/{GOLD_PREFIX}/transaction_fact/**/*.parquet", True
+    return f"s3://{BUCKET_NAME}/{GOLD_PREFIX}/{table_name}.parquet", False
+
 def query_from_minio_parquet(con, table_name):
-    """Query from MinIO parquet file"""
+    """Row count from MinIO parquet footer statistics.
+
+    COUNT(*) over read_parquet scans the data pages; parquet_file_metadata
+    reads only the Thrift footer of each file, which already carries the
+    exact row count.
+    """
     try:
-        parquet_path = f"s3://{BUCKET_NAME}/{GOLD_PREFIX}/{table_name}.parquet"
-        query = f"SELECT COUNT(*) AS total_rows FROM read_parquet('{parquet_path}');"
-        result = con.execute(query).fetchone()
+        parquet_path, _ = _parquet_source(table_name)
+        result = con.execute(
+            "SELECT SUM(num_rows) FROM parquet_file_metadata(?);", [parquet_path]
+        ).fetchone()
         return result[0]
     except Exception as e:
         print(f"⚠️ Could not query from MinIO parquet: {e}")
     return None
 
+def query_counts_from_minio_parquet(con, table_names):
+    """Footer-based row counts for several gold tables in one query.
+
+    Passing the whole path list to parquet_file_metadata folds the
+    per-table calls into a single statement; results are grouped back to
+    tables by path prefix (the fact glob expands to many files).
+    """
+    paths = {_parquet_source(t)[0]: t for t in table_names}
+    counts = {}
+    try:
+        rows = con.execute(
+            "SELECT file_name, SUM(num_rows) FROM parquet_file_metadata(?) GROUP BY file_name;",
+            [list(paths)],
+        ).fetchall()
+        for file_name, num_rows in rows:
+            table = paths.get(file_name)
+            if table is None:
+                table = next(
+                    (t for p, t in paths.items() if file_name.startswith(p.split("*")[0])),
+                    None,
+                )
+            if table is not None:
+                counts[table] = counts.get(table, 0) + (num_rows or 0)
+    except Exception as e:
+        print(f"⚠️ Could not read parquet metadata from MinIO: {e}")
+    return counts
+
 def get_table_data(con, table_name, limit=10):
-    """Get sample data from table"""
+    """Get sample data from table as an Arrow table (no pandas copy)"""
     try:
-        # Try DuckDB table first
+        # Try DuckDB table first - the identifier can't be a bind parameter,
+        # but it's validated against the catalog cache; the limit is bound
         try:
-            result = con.execute(f"SELECT COUNT(*) FROM information_schema.tables WHERE table_name = '{table_name}'").fetchone()
-            if result[0] > 0:
-                query = f"SELECT * FROM {table_name} LIMIT {limit};"
-                return con.execute(query).fetchdf()
+            if _table_exists(con, table_name):
+                return con.execute(
+                    f"SELECT * FROM {table_name} LIMIT ?;", [limit]
+                ).arrow()
         except:
             pass
-        
+
         # Fallback to MinIO parquet
-        parquet_path = f"s3://{BUCKET_NAME}/{GOLD_PREFIX}/{table_name}.parquet"
-        query = f"SELECT * FROM read_parquet('{parquet_path}') LIMIT {limit};"
-        return con.execute(query).fetchdf()
+        parquet_path, hive = _parquet_source(table_name)
+        return con.execute(
+            f"SELECT * FROM read_parquet(?, hive_partitioning={str(hive).lower()}) LIMIT ?;",
+            [parquet_path, limit],
+        ).arrow()
     except Exception as e:
         print(f"⚠️ Could not get table data: {e}")
         return None
@@ -102,8 +180,14 @@ def main():
     print("-" * 60)
     
     try:
-        # Connect to DuckDB
-        con = duckdb.connect(db_path if os.path.exists(db_path) else ":memory:")
+        # Connect to DuckDB. Fall back to a persistent cache file rather than
+        # :memory: so the object cache (parquet footers translated once) can
+        # survive across invocations of this tool
+        if not os.path.exists(db_path):
+            cache_dir = os.path.expanduser("~/.cache")
+            os.makedirs(cache_dir, exist_ok=True)
+            db_path = os.path.join(cache_dir, "tx_query.duckdb")
+        con = duckdb.connect(db_path)
         
         # Configure S3/MinIO access
         setup_duckdb_s3(con, minio_endpoint)
@@ -130,9 +214,10 @@ def main():
         # Get sample data
         print(f"\n📋 Sample data from {table_name} (first 5 rows):")
         print("-" * 60)
-        df = get_table_data(con, table_name, limit=5)
-        if df is not None and not df.empty:
-            print(df.to_string())
+        sample = get_table_data(con, table_name, limit=5)
+        if sample is not None and sample.num_rows > 0:
+            # Convert to pandas only at the print boundary
+            print(sample.to_pandas().to_string())
         else:
             print("No data available")
         
@@ -143,14 +228,16 @@ def main():
         # Try to get more stats if available
         try:
             if count and count > 0:
-                # Get sample of other tables
+                # Get counts of the other tables - anything not in the local
+                # DuckDB catalog is resolved from MinIO in one footer query
                 other_tables = ["dim_user", "dim_category", "dim_payment", "dim_date"]
+                counts = {t: query_from_duckdb_table(con, t) for t in other_tables}
+                missing = [t for t, c in counts.items() if c is None]
+                if missing:
+                    counts.update(query_counts_from_minio_parquet(con, missing))
                 for other_table in other_tables:
-                    other_count = query_from_duckdb_table(con, other_table)
-                    if other_count is None:
-                        other_count = query_from_minio_parquet(con, other_table)
-                    if other_count is not None:
-                        print(f"  {other_table}: {other_count} rows")
+                    if counts.get(other_table) is not None:
+                        print(f"  {other_table}: {counts[other_table]} rows")
         except Exception as e:
             print(f"  (Could not get additional stats: {e})")
         